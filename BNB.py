@@ -1,7 +1,7 @@
-from math import sqrt
 import numpy as np
 import time
 import os
+import tspRead
 
 """
 TSP Branch and Bound algorithm
@@ -18,14 +18,6 @@ def second_smallest(numbers):
     return m2
 
 
-# calculate Euclidean distance between two nodes
-def distance(v1, v2):
-    d1 = v2[1] * 1.0 - v1[1] * 1.0  # y2 - y1
-    d2 = v2[0] * 1.0 - v1[0] * 1.0  # x2 - x1
-    dis = sqrt(d1 ** 2 + d2 ** 2)
-    return int(round(dis, 0))
-
-
 # Read TSP files into a city matrix
 class TSP_Read:
     def __init__(self):
@@ -35,32 +27,19 @@ class TSP_Read:
         self.number = ''
 
     def read_file(self, filename):
-        f = open(filename, 'r')
-        for i in range(5):
-            self.header.append(f.readline())  # reads and stores the header section of the file
-        line = f.readline()
-        label = 0
-        coordinates = [[]]
-        while line != 'EOF':
-            sp_line = line.split()
-            if sp_line[0] == 'EOF':
-                break
-            label = int(sp_line[0])
-            coordinates.append([float(sp_line[1]), float(sp_line[2])])
-            line = f.readline()
+        instance = tspRead.readInstance(filename)
+        self.header = [instance.name, instance.comment, instance.dimension, instance.edgeWeightType]  # stores the header section of the file
+        label = instance.dimension
+        distances = instance.distanceMatrix().tolist()
 
         self.number = label
         self.filename = filename  # updates the filename
-        self.matrix = [[0 for i in range(label + 1)] for j in range(label + 1)]
-        self.matrix[0][0] = float('inf')
-        for i in range(0, label + 1):
-            for j in range(0, label + 1):
-                if i == j:
-                    self.matrix[i][j] = float('inf')
-                elif i == 0 or j == 0:
-                    self.matrix[i][j] = float('inf')
-                else:
-                    self.matrix[i][j] = distance(coordinates[i], coordinates[j])
+        # cities are numbered from 1, row and column 0 are not used
+        self.matrix = [[float('inf') for i in range(label + 1)] for j in range(label + 1)]
+        for i in range(1, label + 1):
+            for j in range(1, label + 1):
+                if i != j:
+                    self.matrix[i][j] = distances[i - 1][j - 1]
 
         # print(self.matrix)
 
@@ -97,7 +76,16 @@ class TSP_solution:
         # Start TSP BnB
         self.TSP_BNB(cur_bound, 0, 1, cur_path)
 
+    # Called at every node of the search tree, before the time check
+    def update_bound(self):
+        pass
+
+    # Called when a shorter tour is found, final_path and final_res hold it
+    def new_solution(self, cur_time):
+        print("%.2f" % round((cur_time - self.start_time), 2), self.final_res, sep=', ', file=self.trace_file)
+
     def TSP_BNB(self, cur_bound, cur_distance, level, cur_path):
+        self.update_bound()
         # When time is over cutting time, the program finished
         cur_time = time.time()
         if cur_time >= self.longest_time:
@@ -111,7 +99,7 @@ class TSP_solution:
                 self.final_path = cur_path[:]
                 self.final_path.append(cur_path[1])
                 self.final_res = cur_res
-                print("%.2f" % round((cur_time - self.start_time), 2), self.final_res, sep=', ', file=self.trace_file)
+                self.new_solution(cur_time)
                 return
 
         # choose the closest city to the current one, then next
@@ -1,9 +1,8 @@
-from math import sqrt
 import networkx as nx
-import sys
 import random
 import time
 import os
+import tspRead
 
 """
 TSP 2-Approximation Algorithm
@@ -14,15 +13,9 @@ TSP 2-Approximation Algorithm
 
 """
 
-def cost(v1, v2):
-    # This function calculates the distance between two vertices v1 and v2
-    # The result is rounded to an integer
-    return round(sqrt((v1["x"] - v2["x"]) ** 2 + (v1["y"] - v2["y"]) ** 2))
-
-
-def Prim(vertices, root):
+def Prim(matrix, root):
     # We implement Prim's algorithm to construct a Minimum Spanning Tree
-    nodes = list(range(len(vertices)))  # Nodes number from 0 to N-1
+    nodes = list(range(len(matrix)))  # Nodes number from 0 to N-1
     new_nodes = []  # The nodes list for tree
     mst_edges = []  # The edge set for MST
     # 1. Push the root node into the new_nodes list
@@ -31,19 +24,20 @@ def Prim(vertices, root):
     # 2. Each iteration, we move a node v from nodes list to new_nodes list
     #    so that edge (u,v) has the minimum weight for any u in list new_node.
     #    The loop terminates when all vertices are moved from nodes to new_nodes.
+    #    cost_to[v] and parent[v] keep the cheapest edge (parent[v],v) from the tree
+    #    to v, so each iteration only looks at the edges of the node just moved.
+    cost_to = list(matrix[root])
+    parent = [root] * len(matrix)
     while len(nodes) != 0:
-        cost_min = sys.maxsize  # Record the minimum weight edge
-        for v in nodes:
-            for u in new_nodes:
-                cur = cost(vertices[u], vertices[v])    # The cost of current edge
-                if cur < cost_min:  # Update edge (u_min,v_min) when current weight is smaller
-                    u_min = u   
-                    v_min = v
-                    cost_min = cur
+        v_min = min(nodes, key=cost_to.__getitem__)   # The minimum weight edge
         # Move node v_min from nodes to new_nodes
         new_nodes.append(v_min)
         nodes.remove(v_min)
-        mst_edges.append((u_min, v_min, cost_min))  # Add edge (u_min, v_min) to MST
+        mst_edges.append((parent[v_min], v_min, cost_to[v_min]))  # Add edge (u_min, v_min) to MST
+        for v in nodes:
+            if matrix[v_min][v] < cost_to[v]:  # Update the cheapest edge to v when v_min is closer
+                cost_to[v] = matrix[v_min][v]
+                parent[v] = v_min
     return mst_edges
 
 
@@ -57,12 +51,12 @@ def DFS(edges):
     return dfs_path
 
 
-def distance(path, vertices):
+def distance(path, matrix):
     # In this function, we calculate the total distance of the tour
     dist = 0
     for i in range(len(path) - 1):
-        dist += cost(vertices[path[i]], vertices[path[i+1]])
-    dist += cost(vertices[path[-1]], vertices[path[0]]) # Add the distance between the starting point and the last one
+        dist += matrix[path[i]][path[i+1]]
+    dist += matrix[path[-1]][path[0]] # Add the distance between the starting point and the last one
     return dist
 
 
@@ -72,26 +66,14 @@ def mst_approx(file, cutoff,random_seed):
     random.seed(random_seed)    
 
     # Reading input file and construct the graph
-    vertices = []
-    f = open(file, "r")
-    content = f.readlines()
-    for line in content:
-        line = line.split()
-        try:
-            float(line[0])
-        except (ValueError, IndexError):
-            continue
-        # The vertex information is stored in a dictionary including its x position
-        # y position and vertex id. All vertices form a list.
-        vertex = {"id": float(line[0]), "x": float(line[1]), "y": float(line[2])}
-        vertices.append(vertex)
-    f.close()
+    # The distance between vertices u and v is matrix[u][v], rounded to an integer
+    matrix = tspRead.readInstance(file).distanceMatrix().tolist()
 
-    root = random.randint(0, len(vertices)-1)   # Randomly choose a root to construct the MST
+    root = random.randint(0, len(matrix)-1)   # Randomly choose a root to construct the MST
     start = time.time()   # Record the start time
-    mst_edges = Prim(vertices, root)    # Construct MST from the root node
+    mst_edges = Prim(matrix, root)    # Construct MST from the root node
     tour = DFS(mst_edges)   # Get the Hamiltonian cycle by pre-order traversal of MST
-    dist = distance(tour, vertices) # Calculate total distance of the tour
+    dist = distance(tour, matrix) # Calculate total distance of the tour
     end = time.time()   # Record the end time
 
     # Write results into trace and solution files
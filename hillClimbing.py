@@ -1,35 +1,24 @@
-import math
 import random
 import time
 from decimal import Decimal
 import os
+import numpy as np
+import tspRead
 """
 TSP Hill Climbing Algorithm
 """
 
-def getPosition(file):
-    '''Read in the positioon of palces'''
-    f = open(file, 'r')
-    coordinates = []
-    lineNum = 0
-    for line in iter(f):
-        lineNum += 1
-        if (lineNum > 5):
-            lineArr = line.strip().split(" ")
-            try:
-                x = float(lineArr[1])
-                y = float(lineArr[2])
-                coordinates.append((x, y))
-            except:
-                continue
-    return coordinates
-
-def getDistances(coordinates):
-    '''Take two the coordiantes of two places, and calculate theri distance'''
+RESTARTS = ['random', 'ils']  # what to do at a local optimum
+ACCEPTANCES = ['better', 'always', 'threshold']  # which local optimum iterated local search continues from
+EVALUATIONS = ['loop', 'vector']  # how the neighbours are scored
+SELECTIONS = ['best', 'first']  # which improving neighbour the vectorized climb moves to
+
+def getDistances(matrix):
+    '''Turn the distance matrix into a dictionary keyed by pairs of places'''
     distances = {}
-    for i, (x1 , y1) in enumerate(coordinates):
-        for j , (x2 , y2) in enumerate(coordinates):
-            distances[i, j] = math.sqrt((x1 - x2)**2+(y1 - y2)**2)
+    for i, row in enumerate(matrix.tolist()):
+        for j, distance in enumerate(row):
+            distances[i, j] = distance
     return distances
 
 # path : a 1-d array contain the index of the city along the path
@@ -43,10 +32,10 @@ def calPathDistances(path, distances):
     total += distances[path[-1], path[0]]
     return total
 
-def genRandomPath(coordinates):
-    '''Generate a random path along the coordinates'''
+def genRandomPath(size):
+    '''Generate a random path through size places'''
     path = []
-    for i in range(len(coordinates)):
+    for i in range(size):
         path.append(i)
 
     random.shuffle(path)
@@ -73,7 +62,7 @@ def genNeighbor(path):
             yield copy
 
 
-def hillClimbing(filename, distances, cutOffTime, random_seed, coordinates):
+def hillClimbing(filename, distances, cutOffTime, random_seed, size):
 
     ''' Perform hillClimbing algorithm'''
 
@@ -92,9 +81,9 @@ def hillClimbing(filename, distances, cutOffTime, random_seed, coordinates):
     while time.time() - startTime < cutOffTime:
         
         ''' If there is not move in last try, then restart by choosing another start point'''
-        start = genRandomPath(coordinates)
+        start = genRandomPath(size)
         while tuple(start) in path:
-            start = genRandomPath(coordinates)
+            start = genRandomPath(size)
 
         localPath = start
 
@@ -135,14 +124,303 @@ def hillClimbing(filename, distances, cutOffTime, random_seed, coordinates):
     duration = time.time() - startTime
     return (globalScore, globalPath,duration)
 
-def runHillClimbing(filename, cutoff_time, random_seed):
+def swapDelta(path, i, j, distances):
+    '''Change of the total distance if the places at positions i and j are exchanged'''
+    size = len(path)
+    edges = {(i - 1) % size, i, (j - 1) % size, j}
+    before = 0
+    for k in edges:
+        before += distances[path[k], path[(k + 1) % size]]
+    path[i], path[j] = path[j], path[i]
+    after = 0
+    for k in edges:
+        after += distances[path[k], path[(k + 1) % size]]
+    path[i], path[j] = path[j], path[i]
+    return after - before
+
+def localClimb(path, dirty, distances, startTime, cutOffTime, callback=None):
+    '''Hill climb with swaps, only trying swaps that involve a dirty position.
+    Positions next to an accepted swap become dirty again.
+    callback is called with the change of the total distance after every swap taken.'''
+    size = len(path)
+    dirty = list(dirty)
+    queued = set(dirty)
+    while dirty and time.time() - startTime < cutOffTime:
+        i = dirty.pop()
+        queued.discard(i)
+        for j in range(size):
+            delta = swapDelta(path, i, j, distances) if j != i else 0
+            if delta < -1e-9:
+                ''' A swap found after the cutoff is not taken'''
+                if time.time() - startTime >= cutOffTime:
+                    return path
+                path[i], path[j] = path[j], path[i]
+                if callback is not None:
+                    callback(delta)
+                for k in (i - 1, i, i + 1, j - 1, j, j + 1):
+                    k %= size
+                    if k not in queued:
+                        queued.add(k)
+                        dirty.append(k)
+                break
+    return path
+
+def doubleBridge(path):
+    '''Cut the path into A B C D and reconnect it as A C B D.
+    Return the new path and the positions next to the four changed edges.'''
+    size = len(path)
+    p1, p2, p3 = sorted(random.sample(range(1, size), 3))
+    kicked = path[:p1] + path[p2:p3] + path[p1:p2] + path[p3:]
+    p = p1 + p3 - p2
+    dirty = {p1 - 1, p1, p - 1, p, p3 - 1, p3 % size, size - 1, 0}
+    return kicked, dirty
+
+def accept(score, currentScore, globalScore, acceptance, threshold):
+    '''Decide whether the search continues from a new local optimum'''
+    if acceptance == 'better':
+        return score < currentScore
+    if acceptance == 'always':
+        return True
+    if acceptance == 'threshold':
+        return score < globalScore * (1 + threshold)
+    raise ValueError('Unknown acceptance criterion "%s"' % acceptance)
+
+def iteratedLocalSearch(filename, distances, cutOffTime, random_seed, size, acceptance='better', threshold=0.01, climb=localClimb):
+
+    ''' Perform iterated local search: kick the current local optimum with a
+    double bridge and climb again only around the changed edges'''
+
+    base = os.path.basename(filename)
+    traceFile = open("./output/"+base[:-4] + "_LS1_" + str(cutOffTime) + "_" + str(random_seed) + ".trace", "a")
+
+    startTime = time.time()
+
+    ''' Follow the length of the path being climbed, so every shorter tour
+    goes to the trace as soon as it is found, also during the first climb'''
+    score = 0
+    tracedScore = 1e20
+
+    def improved(change):
+        nonlocal score, tracedScore
+        score += change
+        if score < tracedScore:
+            tracedScore = score
+            timeSoFar = Decimal(time.time() - startTime).quantize(Decimal("0.00"))
+            traceFile.write(str(timeSoFar) + ", " + str(int(score)) + "\n")
+
+    current = genRandomPath(size)
+    score = calPathDistances(current, distances)
+    improved(0)
+    current = climb(current, range(size), distances, startTime, cutOffTime, improved)
+    currentScore = int(calPathDistances(current, distances))
+
+    globalPath = current[:]
+    globalScore = currentScore
+
+    ''' A double bridge needs four non-empty pieces'''
+    while size >= 8 and time.time() - startTime < cutOffTime:
+        candidate, dirty = doubleBridge(current)
+        score = calPathDistances(candidate, distances)
+        improved(0)  # the kick itself may be shorter
+        candidate = climb(candidate, dirty, distances, startTime, cutOffTime, improved)
+        score = int(calPathDistances(candidate, distances))
+
+        if score < globalScore:
+            globalPath = candidate[:]
+            globalScore = score
+
+        if accept(score, currentScore, globalScore, acceptance, threshold):
+            current = candidate
+            currentScore = score
+
+    traceFile.close()
+    duration = time.time() - startTime
+    return (globalScore, globalPath, duration)
+
+def swapGains(path, distances, first=0, last=None, rows=None):
+    '''Change of the total distance for exchanging the places at positions i < j,
+    as rows i = first .. last - 1 (all rows by default) and columns j.
+    Given a list of rows instead, each row holds every swap of its position, j < i included.
+    Entries that are not a move are inf.'''
+    t = np.array(path)
+    size = len(t)
+    upper = rows is None
+    if upper:
+        rows = np.arange(first, size if last is None else last)
+    rows = np.asarray(rows)
+    prev = np.roll(t, 1)
+    nxt = np.roll(t, -1)
+    r = rows[:, None]
+    ''' t[j] at position i, plus t[i] at position j'''
+    placed = distances[prev[r], t[None, :]] + distances[t[None, :], nxt[r]] \
+        + distances[prev[None, :], t[r]] + distances[t[r], nxt[None, :]]
+    old = distances[prev, t] + distances[t, nxt]
+    gains = placed - old[r] - old[None, :]
+    ''' Neighbouring positions share an edge that does not change'''
+    edge = distances[t, nxt]
+    index = np.arange(len(rows))
+    gains[index, (rows + 1) % size] += 2 * edge[rows]
+    gains[index, (rows - 1) % size] += 2 * edge[(rows - 1) % size]
+    columns = np.arange(size)[None, :]
+    gains[columns <= r if upper else columns == r] = np.inf
+    return gains
+
+def twoOptGains(path, distances, first=0, last=None, rows=None):
+    '''Change of the total distance for reversing the path between positions i + 1 and j,
+    as rows i = first .. last - 1 (all rows by default) and columns j.
+    Given a list of rows instead, each row holds every 2-opt move that removes the
+    edge after its position, j < i included, which reverses between j + 1 and i.
+    Entries that are not a move are inf.'''
+    t = np.array(path)
+    size = len(t)
+    upper = rows is None
+    if upper:
+        rows = np.arange(first, size if last is None else last)
+    rows = np.asarray(rows)
+    nxt = np.roll(t, -1)
+    edge = distances[t, nxt]
+    r = rows[:, None]
+    gains = distances[t[r], t[None, :]] + distances[nxt[r], nxt[None, :]] - edge[r] - edge[None, :]
+    columns = np.arange(size)[None, :]
+    if upper:
+        gains[columns <= r + 1] = np.inf
+        if rows[0] == 0:
+            gains[0, size - 1] = np.inf
+    else:
+        ''' Removing two edges that touch does not change the tour'''
+        gains[(columns - r) % size <= 1] = np.inf
+        gains[(r - columns) % size == 1] = np.inf
+    return gains
+
+def chooseMove(gains, selection):
+    '''Take the best or the first improving entry of gains, stacked by row, kind and column.
+    Return its index and value, or None if no entry shortens the path.'''
+    if selection == 'best':
+        k = np.argmin(gains)
+        if gains.flat[k] >= -1e-9:
+            return None
+    else:
+        improving = gains < -1e-9
+        k = np.argmax(improving)
+        if not improving.flat[k]:
+            return None
+    return np.unravel_index(k, gains.shape) + (gains.flat[k],)
+
+def vectorizedClimb(path, dirty, distances, startTime, cutOffTime, selection='best', block=32, callback=None):
+    '''Hill climb scoring swap and 2-opt moves of the path with numpy.
+    The moves of the dirty positions are scored first, and all moves only once
+    those have no improving one. Dirty positions that still have an improving move
+    stay dirty, and the positions next to a move taken become dirty.
+    With best, the best scored move is taken. With first, moves are scored block
+    rows at a time in order of position, and the first improving one is taken as
+    soon as a block has one.
+    callback is called with the change of the total distance after every move taken.'''
+    path = path[:]
+    size = len(path)
+    if size < 4:
+        return path
+    if selection not in SELECTIONS:
+        raise ValueError('Unknown selection "%s"' % selection)
+    ''' With every position dirty, scoring all moves is the same and cheaper'''
+    dirty = set(dirty) if dirty is not None and len(dirty) < size else set()
+    step = block if selection == 'first' else size
+    while time.time() - startTime < cutOffTime:
+        move = None
+        ''' Scan order: by position i, the swaps of i before its 2-opt moves'''
+        rows = sorted(dirty)
+        for first in range(0, len(rows), step):
+            scanned = rows[first:first + step]
+            gains = np.stack((swapGains(path, distances, rows=scanned), twoOptGains(path, distances, rows=scanned)), axis=1)
+            dirty.difference_update(np.array(scanned)[(gains >= -1e-9).all(axis=(1, 2))].tolist())
+            move = chooseMove(gains, selection)
+            if move is not None:
+                i, kind, j, change = move
+                move = (kind, scanned[i], j, change)
+                break
+        if move is None:
+            for first in range(0, size, step):
+                last = min(first + step, size)
+                gains = np.stack((swapGains(path, distances, first, last), twoOptGains(path, distances, first, last)), axis=1)
+                move = chooseMove(gains, selection)
+                if move is not None:
+                    i, kind, j, change = move
+                    move = (kind, first + i, j, change)
+                    break
+        if move is None:
+            break
+        ''' A move found after the cutoff is not taken'''
+        if time.time() - startTime >= cutOffTime:
+            break
+        kind, i, j, change = move
+        if kind == 0:
+            path[i], path[j] = path[j], path[i]
+            touched = (i - 1, i, i + 1, j - 1, j, j + 1)
+        else:
+            i, j = min(i, j), max(i, j)
+            path[i + 1:j + 1] = path[i + 1:j + 1][::-1]
+            ''' Dirty positions inside the reversed part move with their places'''
+            dirty = set(i + 1 + j - k if i < k <= j else k for k in dirty)
+            touched = (i, i + 1, j, j + 1)
+        dirty.update(k % size for k in touched)
+        if callback is not None:
+            callback(change)
+    return path
+
+def vectorizedHillClimbing(filename, distances, cutOffTime, random_seed, size, selection='best'):
+
+    ''' Perform hillClimbing algorithm with numpy scoring of the neighbours'''
+
+    base = os.path.basename(filename)
+    traceFile = open("./output/"+base[:-4] + "_LS1_" + str(cutOffTime) + "_" + str(random_seed) + ".trace", "a")
+
+    startTime = time.time()
+
+    globalScore = 1e20
+    globalPath = []
+
+    while time.time() - startTime < cutOffTime:
+        localPath = vectorizedClimb(genRandomPath(size), None, distances, startTime, cutOffTime, selection)
+        localScore = int(calPathDistances(localPath, distances))
+
+        if localScore < globalScore:
+            globalPath = localPath
+            globalScore = localScore
+            timeSoFar = Decimal(time.time() - startTime).quantize(Decimal("0.00"))
+            traceFile.write(str(timeSoFar) + ", " + str(globalScore) + "\n")
+
+    traceFile.close()
+    duration = time.time() - startTime
+    return (globalScore, globalPath, duration)
+
+def runHillClimbing(filename, cutoff_time, random_seed, restart='random', acceptance='better', evaluation='loop', selection='best', threshold=0.01):
+    if restart not in RESTARTS:
+        raise ValueError('Unknown restart "%s"' % restart)
+    if acceptance not in ACCEPTANCES:
+        raise ValueError('Unknown acceptance criterion "%s"' % acceptance)
+    if evaluation not in EVALUATIONS:
+        raise ValueError('Unknown evaluation "%s"' % evaluation)
+    if selection not in SELECTIONS:
+        raise ValueError('Unknown selection "%s"' % selection)
     random_seed = float(random_seed)
     cutoff_time = float(cutoff_time)
     random.seed(random_seed)
-    
-    coordinates = getPosition(filename)  # Read in data file
-    distances = getDistances(coordinates)  # Compute all the distances
-    result, bestPath,duration = hillClimbing(filename, distances, cutoff_time,random_seed, coordinates)
+
+    instance = tspRead.readInstance(filename)  # Read in data file
+    size = instance.dimension  # Number of places
+    if evaluation == 'vector':
+        distances = instance.distanceMatrix().astype(float)  # All the distances as a numpy matrix
+        climb = lambda path, dirty, distances, startTime, cutOffTime, callback=None: \
+            vectorizedClimb(path, dirty, distances, startTime, cutOffTime, selection, callback=callback)
+    else:
+        distances = getDistances(instance.distanceMatrix())  # Compute all the distances
+        climb = localClimb
+    if restart == 'ils':
+        ''' Iterated local search keeps the best tour and kicks it instead of restarting'''
+        result, bestPath, duration = iteratedLocalSearch(filename, distances, cutoff_time, random_seed, size, acceptance, threshold, climb=climb)
+    elif evaluation == 'vector':
+        result, bestPath, duration = vectorizedHillClimbing(filename, distances, cutoff_time, random_seed, size, selection)
+    else:
+        result, bestPath,duration = hillClimbing(filename, distances, cutoff_time,random_seed, size)
 
     base = os.path.basename(filename)
     solutionFile = open("./output/" + base[:-4] + "_LS1_" + str(cutoff_time) + "_" + str(random_seed)+".sol","w+")
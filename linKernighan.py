@@ -0,0 +1,339 @@
+import random
+import time
+import os
+import tspRead
+
+"""
+TSP Lin-Kernighan style local search (LKH-lite)
+1. Build a nearest neighbour tour and a candidate list of the K closest cities
+   for every city.
+2. Keep the tour in an array together with a position index, so a 2-opt move
+   is a segment reversal that can always reverse the shorter side of the tour.
+3. For every active city t1, grow a chain of sequential 2-opt moves
+   (t1,t2,t3,t4,...) guided by the candidate lists while the partial gain stays
+   positive, and keep the best prefix of the chain (variable depth).
+4. Try Or-opt moves that relocate segments of 1 to 3 cities next to a
+   candidate neighbour, optionally reversed.
+5. Don't-look bits: only cities touched by an improving move are re-examined.
+6. Until the cutoff, kick the best tour with a local double bridge, re-examine
+   only the cities at the ends of the kick, and keep the new tour if it is not longer.
+"""
+
+def getCandidates(distances, k):
+    '''Keep the k nearest neighbours of every city as its candidate list'''
+    candidates = []
+    for i, row in enumerate(distances):
+        order = sorted(range(len(row)), key=row.__getitem__)
+        candidates.append([j for j in order if j != i][:k])
+    return candidates
+
+def genNearestNeighborPath(distances, start):
+    '''Construct a tour by always going to the closest unvisited city'''
+    size = len(distances)
+    visited = [False] * size
+    visited[start] = True
+    path = [start]
+    current = start
+    for _ in range(size - 1):
+        row = distances[current]
+        nextCity = -1
+        for j in range(size):
+            if not visited[j] and (nextCity < 0 or row[j] < row[nextCity]):
+                nextCity = j
+        visited[nextCity] = True
+        path.append(nextCity)
+        current = nextCity
+    return path
+
+def calPathDistances(path, distances):
+    '''Calculate the total distance along a path'''
+    total = 0
+    for i in range(len(path)):
+        total += distances[path[i - 1]][path[i]]
+    return total
+
+
+class LinKernighan(object):
+
+    """Array based tour improved by Or-opt and Lin-Kernighan style moves.
+    """
+
+    # defaults
+    maxDepth = 50   # maximum number of 2-opt moves in one LK chain
+    maxSegment = 3  # longest segment relocated by Or-opt
+    maxKick = 50    # longest segment swapped by a kick
+
+    journal = None  # reversals since mark(), None when not recording
+
+    def __init__(self, path, distances, candidates):
+        self.distances = distances
+        self.candidates = candidates
+        self.size = len(path)
+        self.setTour(path)
+
+    def setTour(self, path):
+        '''Replace the tour by path'''
+        self.tour = path[:]
+        self.pos = [0] * self.size
+        for i, city in enumerate(self.tour):
+            self.pos[city] = i
+        self.length = calPathDistances(self.tour, self.distances)
+
+    def succ(self, city):
+        '''The city after city along the tour'''
+        i = self.pos[city] + 1
+        return self.tour[i if i < self.size else 0]
+
+    def pred(self, city):
+        '''The city before city along the tour'''
+        return self.tour[self.pos[city] - 1]
+
+    def reverse(self, i, j):
+        '''Reverse the tour between positions i and j (inclusive, cyclic).
+        Reversing the complementary segment gives the same cyclic tour, so
+        the shorter of the two is reversed. Return the positions reversed.'''
+        size = self.size
+        inner = (j - i) % size + 1
+        if 2 * inner > size:
+            i, j = (j + 1) % size, (i - 1) % size
+            inner = size - inner
+        start, end = i, j
+        tour, pos = self.tour, self.pos
+        for _ in range(inner // 2):
+            a, b = tour[i], tour[j]
+            tour[i] = b
+            pos[b] = i
+            tour[j] = a
+            pos[a] = j
+            i += 1
+            if i == size:
+                i = 0
+            j -= 1
+            if j < 0:
+                j = size - 1
+        if self.journal is not None:
+            # Reversing the same positions twice cancels out
+            if self.journal and self.journal[-1] == (start, end):
+                self.journal.pop()
+            else:
+                self.journal.append((start, end))
+        return start, end
+
+    def mark(self):
+        '''Start recording reversals, so rollback() can return to the current tour'''
+        self.journal = []
+        self.markedLength = self.length
+
+    def rollback(self):
+        '''Undo the reversals since mark(). A reversal of the shorter side is
+        undone by reversing the same positions again.'''
+        journal = self.journal
+        self.journal = None
+        for i, j in reversed(journal):
+            self.reverse(i, j)
+        self.length = self.markedLength
+
+    def move(self, a, b, c, d):
+        '''2-opt move: remove tour edges (a,b) and (c,d), add (a,c) and (b,d).
+        b must follow a in the same direction as d follows c.
+        Return the positions reversed.'''
+        if self.succ(a) == b:
+            return self.reverse(self.pos[b], self.pos[c])
+        return self.reverse(self.pos[a], self.pos[d])
+
+    def improveLK(self, t1, t2):
+        '''Grow a chain of 2-opt moves starting by breaking edge (t1,t2).
+        Return the cities touched if the chain shortened the tour.'''
+        d = self.distances
+        gain = 0
+        bestGain = 0
+        bestStep = 0
+        moves = []
+        added = set()
+        for _ in range(self.maxDepth):
+            forward = self.succ(t1) == t2
+            g1 = gain + d[t1][t2]
+            bestT3 = -1
+            bestValue = None
+            for t3 in self.candidates[t2]:
+                if g1 - d[t2][t3] <= 0:
+                    break   # candidates are sorted, no later one can keep the gain positive
+                if t3 == t1:
+                    continue
+                t4 = self.pred(t3) if forward else self.succ(t3)
+                if t4 == t2 or (t3, t4) in added:
+                    continue
+                value = d[t3][t4] - d[t2][t3]
+                if bestValue is None or value > bestValue:
+                    bestT3, bestValue = t3, value
+            if bestT3 < 0:
+                break
+            t3 = bestT3
+            t4 = self.pred(t3) if forward else self.succ(t3)
+            gain += d[t1][t2] + d[t3][t4] - d[t1][t4] - d[t2][t3]
+            moves.append((t1, t2, t4, t3) + self.move(t1, t2, t4, t3))
+            added.add((t2, t3))
+            added.add((t3, t2))
+            if gain > bestGain:
+                bestGain = gain
+                bestStep = len(moves)
+            t2 = t4
+
+        # Undo the moves after the best prefix of the chain, last one first
+        while len(moves) > bestStep:
+            start, end = moves.pop()[4:]
+            self.reverse(start, end)
+        if bestGain <= 0:
+            return None
+        self.length -= bestGain
+        touched = set()
+        for move in moves:
+            touched.update(move[:4])
+        return touched
+
+    def improveOrOpt(self, city):
+        '''Move a segment of 1 to maxSegment cities that starts or ends at city
+        between two neighbouring cities elsewhere in the tour.
+        Return the cities touched if the tour is shortened.'''
+        d = self.distances
+        if self.size < 2 * self.maxSegment + 2:
+            return None
+        for length in range(1, self.maxSegment + 1):
+            starts = (city,) if length == 1 else (city, self.tour[(self.pos[city] - length + 1) % self.size])
+            for s1 in starts:
+                segment = [s1]
+                for _ in range(length - 1):
+                    segment.append(self.succ(segment[-1]))
+                s2 = segment[-1]
+                p = self.pred(s1)
+                n = self.succ(s2)
+                removeGain = d[p][s1] + d[s2][n] - d[p][n]
+                if removeGain <= 0:
+                    continue
+                for c in self.candidates[s1] + self.candidates[s2]:
+                    if c in segment:
+                        continue
+                    for e in (self.succ(c), self.pred(c)):
+                        if e in segment:
+                            continue
+                        # orient the edge so that e follows c
+                        a, b = (c, e) if self.succ(c) == e else (e, c)
+                        if a == n or b == p:
+                            continue
+                        reversedGain = removeGain + d[a][b] - d[a][s2] - d[s1][b]
+                        forwardGain = removeGain + d[a][b] - d[a][s1] - d[s2][b]
+                        if reversedGain <= 0 and forwardGain <= 0:
+                            continue
+                        self.move(p, s1, a, b)
+                        self.move(p, a, n, s2)
+                        if forwardGain > reversedGain:
+                            self.move(a, s2, s1, b)
+                        self.length -= max(forwardGain, reversedGain)
+                        return {p, n, a, b, s1, s2}
+        return None
+
+    def kick(self):
+        '''Local double bridge: swap two neighbouring segments B and C of at most
+        maxKick cities, A B C D -> A C B D, with three short reversals.
+        Return the cities at the ends of the changed edges.'''
+        tour, d = self.tour, self.distances
+        size = self.size
+        longest = min(self.maxKick, size // 4)
+        l1 = random.randint(1, longest)
+        l2 = random.randint(1, longest)
+        p = random.randrange(size)
+        a, b1, bL = tour[p - 1], tour[p], tour[(p + l1 - 1) % size]
+        c1, cL, e = tour[(p + l1) % size], tour[(p + l1 + l2 - 1) % size], tour[(p + l1 + l2) % size]
+        self.length += d[a][c1] + d[cL][b1] + d[bL][e] - d[a][b1] - d[bL][c1] - d[cL][e]
+        # Both segments together are at most half of the tour, so each
+        # reversal keeps to these positions instead of the other side
+        self.reverse(p, (p + l1 + l2 - 1) % size)
+        self.reverse(p, (p + l2 - 1) % size)
+        self.reverse((p + l2) % size, (p + l1 + l2 - 1) % size)
+        return {a, b1, bL, c1, cL, e}
+
+    def optimize(self, startTime, cutOffTime, traceFile=None, active=None, bestLength=None, callback=None):
+        '''Improve the tour until no move applies or time runs out.
+        Only the active cities are examined at first, all of them by default.
+        Every tour shorter than bestLength is written to traceFile and passed
+        to callback with its length.'''
+        if active is None:
+            active = list(self.tour)
+            random.shuffle(active)
+        else:
+            active = list(active)
+        queued = [False] * self.size
+        for city in active:
+            queued[city] = True
+        if bestLength is None:
+            bestLength = self.length
+        while active and time.time() - startTime < cutOffTime:
+            t1 = active.pop()
+            queued[t1] = False
+            touched = self.improveLK(t1, self.succ(t1)) or self.improveLK(t1, self.pred(t1)) \
+                or self.improveOrOpt(t1)
+            if touched is None:
+                continue
+            for city in touched:
+                if not queued[city]:
+                    queued[city] = True
+                    active.append(city)
+            if self.length < bestLength:
+                bestLength = self.length
+                if traceFile is not None:
+                    traceFile.write("%.2f, %d\n" % (time.time() - startTime, bestLength))
+                if callback is not None:
+                    callback(self.tour, bestLength)
+        return self.tour, self.length
+
+
+def linKernighan(filename, distances, cutOffTime, random_seed):
+
+    ''' Perform Lin-Kernighan style local search, then kick the best tour and
+    optimize again around the kick until the cutoff'''
+
+    base = os.path.basename(filename)
+    traceFile = open("./output/" + base[:-4] + "_LS3_" + str(cutOffTime) + "_" + str(random_seed) + ".trace", "w+")
+
+    startTime = time.time()
+
+    candidates = getCandidates(distances, 8)
+    start = genNearestNeighborPath(distances, random.randint(0, len(distances) - 1))
+    solver = LinKernighan(start, distances, candidates)
+    traceFile.write("%.2f, %d\n" % (time.time() - startTime, solver.length))
+    _, bestScore = solver.optimize(startTime, cutOffTime, traceFile)
+
+    ''' A kick needs two segments of at most a quarter of the tour.
+    A longer tour is rolled back by undoing its reversals, so the solver
+    always holds the best tour once a round is over'''
+    while solver.size >= 8 and time.time() - startTime < cutOffTime:
+        solver.mark()
+        kicked = solver.kick()
+        solver.optimize(startTime, cutOffTime, traceFile, kicked, bestScore)
+        if solver.length <= bestScore:
+            bestScore = solver.length
+        else:
+            solver.rollback()
+    bestPath = solver.tour
+
+    traceFile.close()
+    duration = time.time() - startTime
+    return (bestScore, bestPath, duration)
+
+def runLinKernighan(filename, cutoff_time, random_seed):
+    random_seed = float(random_seed)
+    cutoff_time = float(cutoff_time)
+    random.seed(random_seed)
+
+    instance = tspRead.readInstance(filename)  # Read in data file
+    distances = instance.distanceMatrix().tolist()  # Compute all the distances
+    result, bestPath, duration = linKernighan(filename, distances, cutoff_time, random_seed)
+
+    base = os.path.basename(filename)
+    solutionFile = open("./output/" + base[:-4] + "_LS3_" + str(cutoff_time) + "_" + str(random_seed) + ".sol", "w+")
+    solutionFile.write(str(result) + "\n")
+
+    # Output lists of points
+    solutionPath = ",".join(str(index) for index in bestPath)
+    solutionFile.write(solutionPath)
+    solutionFile.close()
@@ -0,0 +1,273 @@
+import multiprocessing
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import os
+import BNB
+import approx
+import hillClimbing
+import linKernighan
+import simanneal
+import tspRead
+
+"""
+TSP solver portfolio
+1. Build the MST-approximation tour at once, it is the first incumbent.
+2. Start one process per worker (LS3, LS1, LS2 and BnB). The local searches
+   start from the incumbent, and BnB uses its length as the upper bound.
+3. Workers share the incumbent through shared memory: whoever finds a shorter
+   tour stores it, and the local searches continue from the best tour found
+   by anyone with a double bridge kick.
+4. All improvements go to one trace file as "<time>, <length>, <worker>".
+5. At the cutoff the workers are asked to stop through a shared event. Only
+   workers that are still running after a grace time are killed.
+"""
+
+WORKERS = ['LS3', 'LS1', 'LS2', 'BnB']
+STACK_PER_CITY = 16 * 1024  # bytes of thread stack for each level of the BnB recursion
+
+
+class Incumbent(object):
+
+    """The best tour found by any worker, kept in shared memory.
+    Offers are written into the buffer that is not current and then made current,
+    so the current buffer always holds a whole tour, even if a worker is killed
+    while it offers one.
+    """
+
+    def __init__(self, tour, length, startTime):
+        self.lock = multiprocessing.Lock()
+        self.stop = multiprocessing.Event()  # set when the workers have to stop
+        self.length = multiprocessing.Value('q', int(length), lock=False)  # read without the lock as a bound
+        self.lengths = multiprocessing.Array('q', [int(length)] * 2, lock=False)
+        self.tours = [multiprocessing.Array('i', list(tour), lock=False) for _ in range(2)]
+        self.current = multiprocessing.Value('i', 0, lock=False)
+        self.events = multiprocessing.Queue()
+        self.startTime = startTime
+
+    def offer(self, tour, length, worker):
+        '''Store tour if it is shorter than the incumbent and record who found it'''
+        length = int(length)
+        if length >= self.length.value:
+            return False
+        with self.lock:
+            if length >= self.length.value:
+                return False
+            staging = 1 - self.current.value
+            self.tours[staging][:] = list(tour)
+            self.lengths[staging] = length
+            self.current.value = staging
+            self.length.value = length
+            self.events.put((time.time() - self.startTime, length, worker))
+        return True
+
+    def get(self, timeout=-1):
+        '''Return a copy of the incumbent tour and its length.
+        If the lock cannot be taken within timeout seconds, the current buffer is read anyway.'''
+        locked = self.lock.acquire(timeout=timeout)
+        try:
+            current = self.current.value
+            return self.tours[current][:], self.lengths[current]
+        finally:
+            if locked:
+                self.lock.release()
+
+    def running(self, startTime, cutOffTime):
+        '''Whether a worker may go on'''
+        return not self.stop.is_set() and time.time() - startTime < cutOffTime
+
+
+class SearchStopped(Exception):
+
+    """Raised to leave the branch and bound search at the cutoff.
+    """
+
+
+class SharedBoundSolution(BNB.TSP_solution):
+
+    """Branch and bound that prunes with the length of the shared incumbent
+    and shares every tour it finds.
+    """
+
+    def __init__(self, N, matrix, start, longest_time, incumbent):
+        super(SharedBoundSolution, self).__init__(N, matrix, start, longest_time, None)
+        self.incumbent = incumbent
+        self.final_res = incumbent.length.value
+        self.nodes = 0
+
+    def update_bound(self):
+        # Another worker may have found a shorter tour since the last node
+        self.final_res = min(self.final_res, self.incumbent.length.value)
+        # Returning level by level from a deep search takes seconds, leave it at
+        # once instead. Checking the stop event takes a system call, do it every 1024 nodes
+        self.nodes += 1
+        if time.time() >= self.longest_time or (self.nodes % 1024 == 0 and self.incumbent.stop.is_set()):
+            raise SearchStopped()
+
+    def new_solution(self, cur_time):
+        self.incumbent.offer([i - 1 for i in self.final_path[1:-1]], self.final_res, 'BnB')
+
+
+def linKernighanWorker(matrix, incumbent, startTime, cutOffTime):
+    '''Lin-Kernighan style search with local kicks, sharing every improvement at once
+    and continuing from the incumbent whenever another worker found a shorter tour'''
+    distances = matrix.tolist()
+    candidates = linKernighan.getCandidates(distances, 8)
+    offer = lambda tour, length: incumbent.offer(tour, length, 'LS3')
+    tour, _ = incumbent.get()
+    solver = linKernighan.LinKernighan(tour, distances, candidates)
+    _, bestLength = solver.optimize(startTime, cutOffTime, callback=offer)
+    while solver.size >= 8 and incumbent.running(startTime, cutOffTime):
+        if incumbent.length.value < bestLength:
+            tour, _ = incumbent.get()
+            solver.setTour(tour)
+            bestLength = solver.length
+        solver.mark()
+        kicked = solver.kick()
+        solver.optimize(startTime, cutOffTime, active=kicked, bestLength=bestLength, callback=offer)
+        if solver.length <= bestLength:
+            bestLength = solver.length
+        else:
+            solver.rollback()
+
+def hillClimbingWorker(matrix, incumbent, startTime, cutOffTime):
+    '''Iterated hill climbing, kicking the incumbent once it is stuck'''
+    distances = hillClimbing.getDistances(matrix)
+    tour, _ = incumbent.get()
+    dirty = range(len(tour))
+    while incumbent.running(startTime, cutOffTime):
+        tour = hillClimbing.localClimb(tour, dirty, distances, startTime, cutOffTime)
+        incumbent.offer(tour, hillClimbing.calPathDistances(tour, distances), 'LS1')
+        if len(tour) < 8:
+            break
+        tour, dirty = hillClimbing.doubleBridge(incumbent.get()[0])
+
+def annealWorker(matrix, incumbent, startTime, cutOffTime, sliceTime=2.0):
+    '''Simulated annealing restarted from the incumbent every sliceTime seconds,
+    cooling over the slice and sharing every new best state at once'''
+    distances = matrix.tolist()
+    offer = lambda state, energy: incumbent.offer(state, energy, 'LS2')
+    while incumbent.running(startTime, cutOffTime):
+        tour, length = incumbent.get()
+        tsp = simanneal.TravellingSalesmanProblem(tour, distances)
+        tsp.copy_strategy = "slice"
+        tsp.schedule = "time"
+        tsp.Tmax = max(float(length) / len(tour), 2 * tsp.Tmin)   # reheat to the length of an average edge
+        remaining = cutOffTime - (time.time() - startTime)
+        tsp.anneal(min(sliceTime, remaining), callback=offer)
+
+def branchAndBoundWorker(filename, incumbent, startTime, cutOffTime):
+    '''Branch and bound with the incumbent as upper bound'''
+    reader = BNB.TSP_Read()
+    reader.read_file(filename)
+    TSP = SharedBoundSolution(reader.number, reader.matrix, startTime, startTime + cutOffTime, incumbent)
+    # The search recurses once per city of the tour. Run it in a thread with room
+    # for that many frames, the main thread's stack cannot be grown
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), reader.number + 1000))
+    threading.stack_size(max(threading.stack_size(), STACK_PER_CITY * (reader.number + 1000)))
+    failure = []
+
+    def search():
+        try:
+            TSP.TSP()
+        except SearchStopped:
+            pass
+        except BaseException as e:
+            failure.append(e)
+
+    thread = threading.Thread(target=search)
+    thread.start()
+    thread.join()
+    if failure:
+        raise failure[0]
+
+def runWorker(name, filename, matrix, incumbent, startTime, cutOffTime, random_seed):
+    '''Entry point of a worker process'''
+    random.seed(random_seed)
+    try:
+        if name == 'LS3':
+            linKernighanWorker(matrix, incumbent, startTime, cutOffTime)
+        elif name == 'LS1':
+            hillClimbingWorker(matrix, incumbent, startTime, cutOffTime)
+        elif name == 'LS2':
+            annealWorker(matrix, incumbent, startTime, cutOffTime)
+        elif name == 'BnB':
+            branchAndBoundWorker(filename, incumbent, startTime, cutOffTime)
+        else:
+            raise ValueError('Unknown portfolio worker "%s"' % name)
+    except Exception:
+        # The other workers go on, report which one failed and why
+        sys.stderr.write("Portfolio worker %s failed:\n%s" % (name, traceback.format_exc()))
+        sys.exit(1)
+
+
+def runPortfolio(filename, cutoff_time, random_seed, workers=WORKERS):
+    for name in workers:
+        if name not in WORKERS:
+            raise ValueError('Unknown portfolio worker "%s"' % name)
+    cutoff_time = float(cutoff_time)
+    random_seed = float(random_seed)
+    random.seed(random_seed)
+
+    startTime = time.time()
+    distances = tspRead.readInstance(filename).distanceMatrix()  # Read and check the instance before creating any file
+
+    base = os.path.basename(filename)
+    traceFile = open("./output/" + base[:-4] + "_Portfolio_" + str(cutoff_time) + "_" + str(random_seed) + ".trace", "w+")
+
+    # The MST-approximation tour is the first incumbent
+    matrix = distances.tolist()
+    root = random.randint(0, len(matrix) - 1)
+    tour = approx.DFS(approx.Prim(matrix, root))
+    length = approx.distance(tour, matrix)
+    traceFile.write("%.2f, %d, %s\n" % (time.time() - startTime, length, 'Approx'))
+
+    incumbent = Incumbent(tour, length, startTime)
+    processes = []
+    for k, name in enumerate(workers):
+        process = multiprocessing.Process(target=runWorker,
+                                          args=(name, filename, distances, incumbent, startTime, cutoff_time, random_seed + k))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    # Merge the improvements of all workers into one trace. At the cutoff the
+    # workers are asked to stop, and only killed if they do not within the grace time
+    deadline = startTime + cutoff_time
+    grace = 2.0
+    while any(process.is_alive() for process in processes) and time.time() < deadline + grace:
+        if time.time() >= deadline:
+            incumbent.stop.set()
+        try:
+            event = incumbent.events.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        traceFile.write("%.2f, %d, %s\n" % event)
+    incumbent.stop.set()
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+    for name, process in zip(workers, processes):
+        if process.exitcode != 0:
+            print("Portfolio worker %s stopped with exit code %d" % (name, process.exitcode))
+    while True:
+        try:
+            event = incumbent.events.get(timeout=0.1)
+        except queue.Empty:
+            break
+        except Exception:
+            # A killed worker may have left half a message in the queue
+            break
+        traceFile.write("%.2f, %d, %s\n" % event)
+    traceFile.close()
+
+    # A killed worker may still hold the lock, the current buffer is whole regardless
+    bestPath, bestLength = incumbent.get(timeout=1.0)
+    solutionFile = open("./output/" + base[:-4] + "_Portfolio_" + str(cutoff_time) + "_" + str(random_seed) + ".sol", "w+")
+    solutionFile.write(str(bestLength) + "\n")
+    solutionFile.write(",".join(str(index) for index in bestPath))
+    solutionFile.close()
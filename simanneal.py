@@ -11,6 +11,7 @@ import random
 import signal
 import sys
 import time
+import tspRead
 
 """
 TSP Simulated Annealing algorithm
@@ -45,6 +46,7 @@ class Annealer(object):
     steps = 500000
     updates = 100
     copy_strategy = 'deepcopy'
+    schedule = 'steps'  # cool from Tmax to Tmin over 'steps' moves, or over the cutoff 'time'
     user_exit = False
     save_state_on_exit = False
 
@@ -116,10 +118,12 @@ class Annealer(object):
                                'the self.copy_strategy "%s"' %
                                self.copy_strategy)
 
-    def anneal(self, cutoff_time, handle):
+    def anneal(self, cutoff_time, handle=None, callback=None):
         """Minimizes the energy of a system by simulated annealing.
         Parameters
         state : an initial arrangement of the system
+        handle : file the time and energy of every new best state is written to
+        callback : function called with every new best state and its energy
         Returns
         (state, energy): the best state and energy found.
         """
@@ -146,7 +150,10 @@ class Annealer(object):
         # Attempt moves to new states
         while time.time() - self.start < cutoff_time:
             step += 1
-            T = self.Tmax * math.exp(Tfactor * step / self.steps)
+            if self.schedule == 'time':
+                T = self.Tmax * math.exp(Tfactor * (time.time() - self.start) / cutoff_time)
+            else:
+                T = self.Tmax * math.exp(Tfactor * step / self.steps)
             dE = self.move()
             if dE is None:
                 E = self.energy()
@@ -168,9 +175,12 @@ class Annealer(object):
                 prevEnergy = E
                 if E < self.best_energy:
                     t = time.time() - self.start
-                    handle.write("%.2f" % t + "\t" + str(int(E)) + "\n")
+                    if handle is not None:
+                        handle.write("%.2f" % t + "\t" + str(int(E)) + "\n")
                     self.best_state = self.copy_state(self.state)
                     self.best_energy = E
+                    if callback is not None:
+                        callback(self.best_state, self.best_energy)
             
             if self.updates > 1:
                 if (step // updateWavelength) > ((step - 1) // updateWavelength):
@@ -216,41 +226,12 @@ class TravellingSalesmanProblem(Annealer):
             e += self.distance_matrix[self.state[i-1]][self.state[i]]
         return e
 
-def read(path, nodes):
-    f = open(path, 'r')
-    for line in f.readlines():
-        line = line.strip()
-        if not len(line) or line.startswith('#'):
-            continue
-        if not line[0].isnumeric():
-            continue
-        node_id, x, y = line.split()
-        nodes[node_id] = (float(x), float(y))
-    f.close()
-
-def distance(a, b):
-    """Calculates distance between two latitude-longitude coordinates."""
-    x1, y1 = a[0], a[1]
-    x2, y2 = b[0], b[1]
-    return round(math.sqrt((x1-x2)**2 + (y1-y2)**2))
-
 def runAnneal(path, cutoff_time, random_seed):
     cutoff_time = float(cutoff_time)
     random_seed = float(random_seed)
     results = {}
-    nodes = {}
-    # read file into nodes
-    read(path, nodes)
-    
-    distance_matrix = {}
-    # create a distance matrix
-    for ka, va in nodes.items():
-        distance_matrix[ka] = {}
-        for kb, vb in nodes.items():
-            if kb == ka:
-                distance_matrix[ka][kb] = 0.0
-            else:
-                distance_matrix[ka][kb] = distance(va, vb)    
+    # read file and create a distance matrix, nodes are numbered from 0
+    distance_matrix = tspRead.readInstance(path).distanceMatrix().tolist()
 
     filename = path.split("/")[-1]
     city = filename.split(".")[0]
@@ -260,7 +241,7 @@ def runAnneal(path, cutoff_time, random_seed):
     f_trace = open("./output/" + traceFile, "w+")
 
     random.seed(random_seed)
-    init_state = list(nodes.keys())
+    init_state = list(range(len(distance_matrix)))
     # initial state, a randomly-ordered itinerary
     random.shuffle(init_state)
     
@@ -268,12 +249,10 @@ def runAnneal(path, cutoff_time, random_seed):
     tsp.copy_strategy = "slice"     # since our state is just a list, slice is the fastest way to copy
     state, e = tsp.anneal(cutoff_time, f_trace)
 
-    while state[0] != '1':
-        state = state[1:] + state[:1]  # rotate node 1 to start
-    for i in range(len(state)):
-        state[i] = str(int(state[i]) - 1)
+    while state[0] != 0:
+        state = state[1:] + state[:1]  # rotate node 0 to start
 
-    route = ",".join(state)
+    route = ",".join(str(i) for i in state)
     """print(city + ": " + str(int(e)) + " miles. Route: " + route)"""
     f_out.write(str(int(e)) + "\n" + route + "\n")
 
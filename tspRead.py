@@ -0,0 +1,230 @@
+import gzip
+import itertools
+import math
+import numpy as np
+
+"""
+Streaming reader for TSP instances
+1. Instances may be plain text or gzip compressed, and may have a TSPLIB header
+   (NAME, DIMENSION, EDGE_WEIGHT_TYPE, EDGE_WEIGHT_FORMAT, ...) or no header at all.
+2. NODE_COORD_SECTION lines "<id> <x> <y>" are parsed chunk by chunk straight
+   into a preallocated array of DIMENSION rows, so the file is never held in memory.
+3. EDGE_WEIGHT_SECTION (EDGE_WEIGHT_TYPE: EXPLICIT) is read the same way into
+   the distance matrix, for every EDGE_WEIGHT_FORMAT of TSPLIB.
+4. Reading stops at EOF, at the end of the file, or at a section we do not need.
+"""
+
+CHUNK_LINES = 65536
+
+# Order of the entries of EDGE_WEIGHT_SECTION, as (lower triangle, offset of the diagonal)
+FORMATS = {
+    'UPPER_ROW': (False, 1), 'LOWER_COL': (False, 1),
+    'UPPER_DIAG_ROW': (False, 0), 'LOWER_DIAG_COL': (False, 0),
+    'LOWER_ROW': (True, -1), 'UPPER_COL': (True, -1),
+    'LOWER_DIAG_ROW': (True, 0), 'UPPER_DIAG_COL': (True, 0),
+}
+
+
+class Instance(object):
+
+    """A TSP instance: either city coordinates or an explicit distance matrix.
+    """
+
+    def __init__(self):
+        self.name = ''
+        self.comment = ''
+        self.dimension = 0
+        self.edgeWeightType = 'EUC_2D'
+        self.edgeWeightFormat = 'FULL_MATRIX'
+        self.coordinates = None  # numpy array of shape (dimension, 2)
+        self.weights = None  # numpy array of shape (dimension, dimension)
+
+    def distanceMatrix(self):
+        '''Return the integer distance between every two cities, following the TSPLIB distance functions'''
+        if self.weights is not None:
+            return self.weights
+        x = self.coordinates[:, 0]
+        y = self.coordinates[:, 1]
+        dx = x[:, None] - x[None, :]
+        dy = y[:, None] - y[None, :]
+        if self.edgeWeightType == 'CEIL_2D':
+            return np.ceil(np.hypot(dx, dy)).astype(np.int64)
+        if self.edgeWeightType == 'ATT':
+            r = np.sqrt((dx ** 2 + dy ** 2) / 10.0)
+            t = np.rint(r)
+            return np.where(t < r, t + 1, t).astype(np.int64)
+        if self.edgeWeightType == 'GEO':
+            return geoDistances(x, y)
+        if self.edgeWeightType == 'EUC_2D':
+            return np.rint(np.hypot(dx, dy)).astype(np.int64)
+        raise ValueError('Unsupported EDGE_WEIGHT_TYPE "%s"' % self.edgeWeightType)
+
+
+def geoDistances(x, y):
+    '''Distances of TSPLIB GEO instances, given as DDD.MM latitude and longitude'''
+    def radians(v):
+        degrees = np.trunc(v)
+        return math.pi * (degrees + 5.0 * (v - degrees) / 3.0) / 180.0
+    lat = radians(x)
+    lon = radians(y)
+    q1 = np.cos(lon[:, None] - lon[None, :])
+    q2 = np.cos(lat[:, None] - lat[None, :])
+    q3 = np.cos(lat[:, None] + lat[None, :])
+    d = np.trunc(6378.388 * np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1, 1)) + 1.0)
+    np.fill_diagonal(d, 0)
+    return d.astype(np.int64)
+
+
+def openFile(filename):
+    '''Open a text or gzip compressed instance'''
+    with open(filename, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(filename, 'rt')
+    return open(filename, 'r')
+
+
+def isNumber(token):
+    '''Whether token can be read as a number'''
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def readCoordinates(lines, dimension):
+    '''Read "<id> <x> <y>" lines into an array until a line that is not a city.
+    Return the coordinates and the lines that are left.'''
+    coordinates = np.empty((dimension if dimension > 0 else 1024, 2))
+    count = 0
+    while True:
+        chunk = list(itertools.islice(lines, CHUNK_LINES))
+        if not chunk:
+            return coordinates[:count], lines
+        rows = [line.split() for line in chunk]
+        rows = [row for row in rows if row]
+        try:
+            block = np.array(rows, dtype=float)
+            if block.ndim != 2 or block.shape[1] < 3:
+                raise ValueError
+            block = block[:, 1:3]
+            end = None
+        except ValueError:
+            # The section ends in this chunk, or a line has extra columns: go line by line
+            block = []
+            end = len(chunk)
+            for k, line in enumerate(chunk):
+                row = line.split()
+                if not row:
+                    continue
+                if not isNumber(row[0]):
+                    end = k
+                    break
+                if len(row) < 3:
+                    continue
+                block.append((float(row[1]), float(row[2])))
+            block = np.array(block, dtype=float).reshape(-1, 2)
+        if count + len(block) > len(coordinates):
+            # DIMENSION was missing or wrong, grow the array
+            grown = np.empty((max(2 * len(coordinates), count + len(block)), 2))
+            grown[:count] = coordinates[:count]
+            coordinates = grown
+        coordinates[count:count + len(block)] = block
+        count += len(block)
+        if end is not None and end < len(chunk):
+            return coordinates[:count], itertools.chain(chunk[end:], lines)
+
+
+def readWeights(lines, dimension, edgeWeightFormat):
+    '''Read the numbers of EDGE_WEIGHT_SECTION into a preallocated array and
+    build the full distance matrix from it.
+    Return the matrix and the lines that are left.'''
+    n = dimension
+    if edgeWeightFormat == 'FULL_MATRIX':
+        total = n * n
+    else:
+        lower, offset = FORMATS[edgeWeightFormat]
+        total = n * (n + 1) // 2 if offset == 0 else n * (n - 1) // 2
+    values = np.empty(total)
+    count = 0
+    for line in lines:
+        row = line.split()
+        if not row:
+            continue
+        if not isNumber(row[0]):
+            lines = itertools.chain([line], lines)
+            break
+        row = np.array(row, dtype=float)[:total - count]
+        values[count:count + len(row)] = row
+        count += len(row)
+        if count == total:
+            break
+    if count < total:
+        raise ValueError('EDGE_WEIGHT_SECTION has %d entries, %d expected' % (count, total))
+
+    if edgeWeightFormat == 'FULL_MATRIX':
+        matrix = values.reshape(n, n)
+    else:
+        matrix = np.zeros((n, n))
+        if lower:
+            index = np.tril_indices(n, min(offset, 0))
+        else:
+            index = np.triu_indices(n, offset)
+        matrix[index] = values
+        matrix = matrix + matrix.T - np.diag(matrix.diagonal())
+    if np.all(matrix == np.floor(matrix)):
+        matrix = matrix.astype(np.int64)
+    return matrix, lines
+
+
+def readInstance(filename):
+    '''Read a TSP instance from filename'''
+    instance = Instance()
+    f = openFile(filename)
+    lines = iter(f)
+    try:
+        while True:
+            line = next(lines, None)
+            if line is None:
+                break
+            row = line.split()
+            if not row:
+                continue
+            if isNumber(row[0]):
+                # No header, the file starts with the cities
+                instance.coordinates, lines = readCoordinates(itertools.chain([line], lines), instance.dimension)
+                continue
+            key, _, value = line.partition(':')
+            key = key.strip().upper()
+            value = value.strip()
+            if key == 'EOF':
+                break
+            elif key == 'NAME':
+                instance.name = value
+            elif key == 'COMMENT':
+                instance.comment = value
+            elif key == 'DIMENSION':
+                instance.dimension = int(value)
+            elif key == 'EDGE_WEIGHT_TYPE':
+                instance.edgeWeightType = value.upper()
+            elif key == 'EDGE_WEIGHT_FORMAT':
+                instance.edgeWeightFormat = value.upper()
+            elif key == 'NODE_COORD_SECTION':
+                instance.coordinates, lines = readCoordinates(lines, instance.dimension)
+            elif key == 'EDGE_WEIGHT_SECTION':
+                instance.weights, lines = readWeights(lines, instance.dimension, instance.edgeWeightFormat)
+            elif key.endswith('_SECTION'):
+                # DISPLAY_DATA_SECTION, FIXED_EDGES_SECTION, ... are not needed
+                if instance.coordinates is not None or instance.weights is not None:
+                    break
+    finally:
+        f.close()
+
+    if instance.weights is None and instance.coordinates is None:
+        raise ValueError('No cities found in ' + filename)
+    if instance.weights is not None:
+        instance.dimension = len(instance.weights)
+    else:
+        instance.dimension = len(instance.coordinates)
+    return instance
@@ -3,25 +3,48 @@ import BNB
 import approx
 import hillClimbing
 import simanneal
+import linKernighan
+import portfolio
 import os
 
 """
 This is the main program combining all algorithms together.
 To run this program, use command:
 tsp_main[.py] -inst <filename>
-              -alg [BnB | Approx | LS1 | LS2]
+              -alg [BnB | Approx | LS1 | LS2 | LS3 | Portfolio]
               -time <cutoff_in_seconds> 
               [-seed <random_seed>]
+              [-restart [random | ils]]
+              [-accept [better | always | threshold]]
+              [-threshold <fraction>]
+              [-eval [loop | vector]]
+              [-select [best | first]]
+-restart, -accept, -threshold, -eval and -select only apply to LS1: with "ils"
+the hill climbing kicks its current local optimum with a double bridge instead
+of restarting from scratch, "threshold" continues from any local optimum less
+than -threshold (default 0.01) above the best one, and with "vector" swap and
+2-opt neighbours are scored with numpy: "best" scores all of them and takes the
+best one, "first" scores them a block of positions at a time and takes the first
+improving one.
+Portfolio starts from the Approx tour and races LS3, LS1, LS2 and BnB on all
+cores, sharing the best tour found so far between them.
 """
 
 def main(args):
 
+    usage = "Usage: tsp_main[.py] -inst <filename> -alg [BnB | Approx | LS1 | LS2 | LS3 | Portfolio] -time <cutoff_in_seconds> [-seed <random_seed>] [-restart [random | ils]] [-accept [better | always | threshold]] [-threshold <fraction>] [-eval [loop | vector]] [-select [best | first]]"
+
     # Catch error when there's not enough arguments
     if len(args) < 6:
-        print("Usage: tsp_main[.py] -inst <filename> -alg [BnB | Approx | LS1 | LS2] -time <cutoff_in_seconds> [-seed <random_seed>]")
+        print(usage)
         return 1
 
     # Read arguments
+    restart = 'random'
+    acceptance = 'better'
+    threshold = '0.01'
+    evaluation = 'loop'
+    selection = 'best'
     for i in range(0, len(args), 2):
         if args[i] == "-inst":
             file_name = args[i+1]
@@ -31,6 +54,30 @@ def main(args):
             cutoff = args[i+1]
         if args[i] == "-seed":
             random_seed = args[i+1]
+        if args[i] == "-restart":
+            restart = args[i+1]
+        if args[i] == "-accept":
+            acceptance = args[i+1]
+        if args[i] == "-threshold":
+            threshold = args[i+1]
+        if args[i] == "-eval":
+            evaluation = args[i+1]
+        if args[i] == "-select":
+            selection = args[i+1]
+
+    # Catch error when an option has an unknown value
+    if restart not in hillClimbing.RESTARTS or acceptance not in hillClimbing.ACCEPTANCES \
+            or evaluation not in hillClimbing.EVALUATIONS or selection not in hillClimbing.SELECTIONS:
+        print(usage)
+        return 1
+    try:
+        threshold = float(threshold)
+    except ValueError:
+        print(usage)
+        return 1
+    if threshold < 0:
+        print(usage)
+        return 1
 
     path = os.getcwd() + "/output"
     folder = os.path.exists(path)
@@ -44,11 +91,15 @@ def main(args):
     if method == 'Approx':
         approx.mst_approx(file_name, cutoff, random_seed)
     if method == 'LS1':
-        hillClimbing.runHillClimbing(file_name, cutoff, random_seed)
+        hillClimbing.runHillClimbing(file_name, cutoff, random_seed, restart, acceptance, evaluation, selection, threshold)
     if method == 'LS2':
         simanneal.runAnneal(file_name, cutoff, random_seed)
+    if method == 'LS3':
+        linKernighan.runLinKernighan(file_name, cutoff, random_seed)
+    if method == 'Portfolio':
+        portfolio.runPortfolio(file_name, cutoff, random_seed)
 
 if __name__ == '__main__':
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
 
 